@@ -0,0 +1,66 @@
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from cachetools import TTLCache
+
+Headers = Dict[str, str]
+
+
+def _etag(body: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class ResponseCache:
+    """Short-lived in-process cache of rendered JSON bodies keyed by query.
+
+    ``fetch`` returns the body plus any extra response headers that belong
+    with it; both are cached together.
+
+    Concurrent misses on the same key wait for a single fetch instead of all
+    hitting the database. ``invalidate`` drops every entry and makes fetches
+    that were already in flight skip storing their (possibly stale) result.
+    ETags are derived from the body, so they stay valid across workers whose
+    caches are not shared.
+    """
+
+    def __init__(self, maxsize: int = 64, ttl: float = 2.0):
+        self._entries: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._version = 0
+
+    def invalidate(self) -> None:
+        self._version += 1
+        self._entries.clear()
+
+    async def get_or_fetch(
+        self, key: Hashable, fetch: Callable[[], Awaitable[Tuple[bytes, Headers]]]
+    ) -> Tuple[str, bytes, Headers]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    version = self._version
+                    body, headers = await fetch()
+                    entry = (_etag(body), body, headers)
+                    if version == self._version:
+                        self._entries[key] = entry
+                return entry
+        finally:
+            if self._locks.get(key) is lock:
+                del self._locks[key]
+
+
+# Module-level so every write handler invalidates the same list views
+ideas_cache = ResponseCache()
@@ -1,38 +1,177 @@
+import asyncio
 import os
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+from typing import Any, Dict
 
-from pymongo import MongoClient
-from bson import ObjectId
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from bson import ObjectId, decode, encode
+from bson.codec_options import CodecOptions
+
+load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "app")
 
-_client = MongoClient(DATABASE_URL)
+# The only client in the process: every app module imports db/collections from here
+_client = AsyncIOMotorClient(DATABASE_URL, maxPoolSize=100, minPoolSize=10, appname="vibecoders")
 db = _client[DATABASE_NAME]
 
+_db_ideas = db["idea"]
+_db_comments = db["comment"]
+_db_meta = db["meta"]
+
+# Bound once: the write paths call it on every request
+_utcnow = datetime.utcnow
+
+
+class ApiDocument(dict):
+    """Document class that shapes BSON into API dicts while it is decoded.
+
+    ``_id`` is stored as ``id`` and ObjectId values become hex strings, so
+    results from the ``*_out`` collections can be passed straight to the
+    response models.
+    """
+
+    def __setitem__(self, key, value):
+        if key == "_id":
+            key = "id"
+        if isinstance(value, ObjectId):
+            value = str(value)
+        super().__setitem__(key, value)
+
+
+# Read-side views of the collections that decode into ApiDocument
+API_CODEC_OPTIONS = CodecOptions(document_class=ApiDocument)
+_db_ideas_out = db.get_collection("idea", codec_options=API_CODEC_OPTIONS)
+_db_comments_out = db.get_collection("comment", codec_options=API_CODEC_OPTIONS)
+
+
+def as_api_document(doc: Dict[str, Any]) -> ApiDocument:
+    """Shape a document we just wrote exactly as a read through the ``*_out`` views would.
+
+    The local BSON round trip applies the same millisecond datetime precision
+    and id handling as the server, without a second request to fetch it back.
+    """
+    return decode(encode(doc), codec_options=API_CODEC_OPTIONS)
+
+
+# Bump when the index set or backfill changes so the next deploy runs them once
+SCHEMA_VERSION = 3
+
+_IDEA_INDEXES = [
+    IndexModel([("created_at", DESCENDING)], background=True),
+    IndexModel([("votes", DESCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], background=True),
+    IndexModel([("comments_count", DESCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], background=True),
+]
+_COMMENT_INDEXES = [
+    IndexModel([("idea_id", ASCENDING), ("_id", DESCENDING)], background=True),
+]
+# Replaced by the compound indexes above but still maintained on every write
+_STALE_INDEXES = [
+    (_db_ideas, "votes_-1"),
+    (_db_comments, "idea_id_1_created_at_-1"),
+]
+_INDEX_NOT_FOUND = (26, 27)  # NamespaceNotFound, IndexNotFound
+
+
+async def ensure_indexes() -> None:
+    await _db_ideas.create_indexes(_IDEA_INDEXES)
+    await _db_comments.create_indexes(_COMMENT_INDEXES)
+    for collection, name in _STALE_INDEXES:
+        try:
+            await collection.drop_index(name)
+        except OperationFailure as e:
+            if e.code not in _INDEX_NOT_FOUND:
+                raise
+
+
+async def convert_comment_idea_ids() -> None:
+    # Comments written before idea_id was stored as an ObjectId reference the
+    # idea by its hex string; convert them so the (idea_id, _id) index finds them
+    await _db_comments.update_many(
+        {"idea_id": {"$type": "string"}},
+        [{"$set": {"idea_id": {"$toObjectId": "$idea_id"}}}],
+    )
+
+
+async def backfill_comments_count() -> None:
+    # Ideas created before comments_count was stored get it computed once here,
+    # so reads can rely on the field instead of counting comments per request.
+    # The count, join and write all run server-side in a single aggregation.
+    # Runs after convert_comment_idea_ids(), so idea_id is always an ObjectId.
+    pipeline = [
+        {"$match": {"comments_count": {"$exists": False}}},
+        {"$project": {"_id": 1}},
+        {
+            "$lookup": {
+                "from": "comment",
+                "let": {"iid": "$_id"},
+                "pipeline": [
+                    # A plain equality on the converted ObjectIds is served by
+                    # the (idea_id, _id) index instead of scanning comments
+                    {"$match": {"$expr": {"$eq": ["$idea_id", "$$iid"]}}},
+                    {"$count": "n"},
+                ],
+                "as": "c",
+            }
+        },
+        {"$project": {"comments_count": {"$ifNull": [{"$first": "$c.n"}, 0]}}},
+        {
+            "$merge": {
+                "into": "idea",
+                "on": "_id",
+                # Overwrite: any value a write put there meanwhile is a partial count
+                "whenMatched": "merge",
+                "whenNotMatched": "discard",
+            }
+        },
+    ]
+    await _db_ideas.aggregate(pipeline).to_list(length=None)
+
 
-def _serialize(doc: Dict[str, Any]) -> Dict[str, Any]:
-    if doc is None:
-        return doc
-    d = dict(doc)
-    if "_id" in d:
-        d["id"] = str(d.pop("_id"))
-    return d
+# Longer than the slowest expected migration; a worker that dies mid-run
+# stops blocking the others once its lease expires
+MIGRATION_LEASE = timedelta(minutes=10)
 
 
-def create_document(collection_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
-    now = datetime.utcnow()
-    payload = {**data, "created_at": now, "updated_at": now}
-    col = db[collection_name]
-    res = col.insert_one(payload)
-    saved = col.find_one({"_id": res.inserted_id})
-    return _serialize(saved)
+async def migrate() -> None:
+    """Create indexes and run the data migrations once per SCHEMA_VERSION across all workers.
 
+    The ``migrated`` marker in the meta collection is only written after every
+    step succeeded. To do the work, a worker takes the ``migration_lock``
+    lease: the upsert only matches an expired lock, so while another worker
+    holds it the insert hits the unique ``_id`` and this worker waits for the
+    marker instead of repeating the index builds. The lease is released
+    however the run ends, and expires on its own if the process is killed.
+    """
+    while True:
+        if await _db_meta.find_one({"_id": "migrated", "version": {"$gte": SCHEMA_VERSION}}):
+            return
+        now = _utcnow()
+        lease = now + MIGRATION_LEASE
+        try:
+            await _db_meta.update_one(
+                {"_id": "migration_lock", "expires_at": {"$lt": now}},
+                {"$set": {"expires_at": lease}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            await asyncio.sleep(1)
+            continue
+        try:
+            await ensure_indexes()
+            await convert_comment_idea_ids()
+            await backfill_comments_count()
+            await _db_meta.update_one(
+                {"_id": "migrated"},
+                {"$set": {"version": SCHEMA_VERSION, "migrated_at": _utcnow()}},
+                upsert=True,
+            )
+        finally:
+            # Only release our own lease, not one taken over after it expired
+            await _db_meta.delete_one({"_id": "migration_lock", "expires_at": lease})
+        return
 
-def get_documents(collection_name: str, filter_dict: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-    col = db[collection_name]
-    cursor = col.find(filter_dict or {})
-    if limit:
-        cursor = cursor.limit(limit)
-    return [_serialize(d) for d in cursor]
@@ -1,28 +1,42 @@
+import asyncio
+import base64
 from datetime import datetime, timedelta
+import logging
 import os
-from typing import List, Optional, Literal
+import re
+from typing import Dict, List, Optional, Literal, Tuple
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from pymongo import MongoClient, ASCENDING, DESCENDING
-from bson import ObjectId
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, TypeAdapter
+from pymongo import DESCENDING
+from bson import ObjectId, decode, encode
+from bson.errors import BSONError
+
+from backend.cache import etag_matches, ideas_cache
+from backend.database import (
+    db,
+    _db_ideas,
+    _db_comments,
+    _db_ideas_out,
+    _db_comments_out,
+    _utcnow,
+    as_api_document,
+    migrate,
+)
 
-# Database setup
-DATABASE_URL = os.getenv("DATABASE_URL", "mongodb://localhost:27017")
-DATABASE_NAME = os.getenv("DATABASE_NAME", "app")
-client = MongoClient(DATABASE_URL)
-db = client[DATABASE_NAME]
+logger = logging.getLogger(__name__)
 
-# Ensure indexes
-_db_ideas = db["idea"]
-_db_comments = db["comment"]
-_db_ideas.create_index([("created_at", DESCENDING)])
-_db_ideas.create_index([("votes", DESCENDING)])
-_db_comments.create_index([("idea_id", ASCENDING), ("created_at", DESCENDING)])
+# Fields needed to build IdeaOut / CommentOut; anything else stays on the server
+_IDEA_FIELDS = {"title": 1, "description": 1, "votes": 1, "comments_count": 1, "created_at": 1, "updated_at": 1}
+_COMMENT_FIELDS = {"idea_id": 1, "author": 1, "content": 1, "created_at": 1, "updated_at": 1}
 
 
 # Helpers
+_HEX24 = re.compile(r"[0-9a-fA-F]{24}").fullmatch
+
+
 class PyObjectId(ObjectId):
     @classmethod
     def __get_validators__(cls):
@@ -32,18 +46,50 @@ class PyObjectId(ObjectId):
     def validate(cls, v):
         if isinstance(v, ObjectId):
             return v
-        try:
-            return ObjectId(str(v))
-        except Exception as e:
-            raise ValueError("Invalid ObjectId") from e
+        # Reject bad input up front so the happy path needs no str() copy or try/except
+        if isinstance(v, str) and _HEX24(v):
+            return ObjectId(v)
+        raise ValueError("Invalid ObjectId")
+
+
+def encode_cursor(sort: str, doc: dict) -> str:
+    # Carry the last row's sort key, created_at and _id so the next page can
+    # filter on them directly instead of looking the row up again
+    key = doc.get("votes" if sort == "votes" else "comments_count")
+    raw = encode({"s": sort, "k": key, "t": doc["created_at"], "i": ObjectId(doc["id"])})
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(token: str, sort: str) -> tuple:
+    try:
+        c = decode(base64.urlsafe_b64decode(token.encode()))
+        # The key lands in equality clauses, so anything but an int/null could be a query operator
+        key_ok = c["k"] is None or type(c["k"]) is int
+        if c["s"] == sort and key_ok and isinstance(c["t"], datetime) and isinstance(c["i"], ObjectId):
+            return c["k"], c["t"], c["i"]
+    except (ValueError, KeyError, BSONError):
+        pass
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(sort_field: str, key: Optional[int], created_at: datetime, last_id: ObjectId) -> dict:
+    # Rows strictly after (key, created_at, _id) in descending order.
+    # A missing/null key sorts below every number, so it can only be followed by other nulls
+    lower = [{sort_field: {"$lt": key}}, {sort_field: None}] if key is not None else []
+    return {
+        "$or": lower + [
+            {sort_field: key, "created_at": {"$lt": created_at}},
+            {sort_field: key, "created_at": created_at, "_id": {"$lt": last_id}},
+        ]
+    }
 
 
-def serialize_id(doc):
-    if not doc:
-        return doc
-    doc = dict(doc)
-    doc["id"] = str(doc.pop("_id"))
-    return doc
+def parse_object_id(value: str, detail: str = "Invalid idea id") -> ObjectId:
+    # One hex check and one ObjectId construction; malformed ids are the client's fault
+    try:
+        return PyObjectId.validate(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=detail)
 
 
 # Schemas
@@ -76,122 +122,213 @@ class CommentOut(BaseModel):
     updated_at: datetime
 
 
+# List endpoints validate and dump the whole page in one pydantic-core call
+# instead of building one model per item and having FastAPI re-validate them
+_IDEA_LIST_ADAPTER = TypeAdapter(List[IdeaOut])
+_COMMENT_LIST_ADAPTER = TypeAdapter(List[CommentOut])
+
+
 # FastAPI app
-app = FastAPI(title="VibeCoders Ideas API")
+app = FastAPI(title="VibeCoders Ideas API", default_response_class=ORJSONResponse)
+# allow_credentials=False with wildcard origins: with True, Starlette would
+# reflect any request origin for credentialed requests
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
-    allow_credentials=True,
+    allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 
+# How long a comment write waits for the startup migration before giving up with a 503
+MIGRATION_WAIT_SECONDS = 5
+
+
+async def _migrate_until_done() -> None:
+    # Mongo may not be reachable yet when the worker boots, so keep retrying
+    delay = 1
+    while True:
+        try:
+            await migrate()
+            return
+        except Exception:
+            logger.exception("Schema migration failed, retrying in %ss", delay)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 60)
+
+
+@app.on_event("startup")
+async def startup():
+    # Index builds run off the boot path; the worker starts serving reads right away
+    app.state.migrate_task = asyncio.create_task(_migrate_until_done())
+
+
+def _migration_done() -> bool:
+    task = app.state.migrate_task
+    return task.done() and not task.cancelled() and task.exception() is None
+
+
+async def _wait_for_migration() -> None:
+    if _migration_done():
+        return
+    try:
+        # Shielded so a timeout or client disconnect ends only this request, not the migration
+        await asyncio.wait_for(asyncio.shield(app.state.migrate_task), MIGRATION_WAIT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail="Database migration in progress, try again shortly",
+            headers={"Retry-After": str(MIGRATION_WAIT_SECONDS)},
+        )
+
+
+@app.get("/")
+async def read_root():
+    return {"message": "VibeCoders Ideas API running"}
+
+
 @app.get("/test")
-def test():
-    # Ping database
-    db.command("ping")
-    return {"status": "ok"}
+async def test():
+    # Diagnostic: always a 200, with the database state reported in the body
+    response = {
+        "backend": "✅ Running",
+        "database": "❌ Not Available",
+        "database_url": None,
+        "database_name": None,
+        "connection_status": "Not Connected",
+        "collections": [],
+    }
+    try:
+        response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
+        response["database_name"] = db.name
+        response["collections"] = (await db.list_collection_names())[:10]
+        response["database"] = "✅ Available"
+        response["connection_status"] = "Connected"
+    except Exception as e:
+        response["database"] = f"❌ Error: {str(e)[:80]}"
+    return response
 
 
 @app.post("/ideas", response_model=IdeaOut)
-def create_idea(payload: IdeaCreate):
-    now = datetime.utcnow()
+async def create_idea(payload: IdeaCreate):
+    now = _utcnow()
     doc = {
+        "_id": ObjectId(),
         "title": payload.title.strip(),
         "description": (payload.description.strip() if payload.description else None),
         "votes": 0,
+        "comments_count": 0,
         "created_at": now,
         "updated_at": now,
     }
-    result = _db_ideas.insert_one(doc)
-    saved = _db_ideas.find_one({"_id": result.inserted_id})
-    serialized = serialize_id(saved)
-    serialized["comments_count"] = 0
-    return IdeaOut(**serialized)
+    await _db_ideas.insert_one(doc)
+    ideas_cache.invalidate()
+    # The document is fully known here, so echo it instead of reading it back
+    return IdeaOut(**as_api_document(doc))
 
 
-@app.get("/ideas", response_model=List[IdeaOut])
-def list_ideas(range: Literal["all", "month", "week"] = "all", sort: Literal["votes", "comments"] = "votes"):
+async def _fetch_ideas_page(range: str, sort: str, limit: int, after: Optional[str]) -> Tuple[bytes, Dict[str, str]]:
     # Time filter
     filter_q = {}
     if range != "all":
-        now = datetime.utcnow()
+        now = _utcnow()
         if range == "month":
             start = now - timedelta(days=30)
         else:  # week
             start = now - timedelta(days=7)
         filter_q["created_at"] = {"$gte": start}
 
-    ideas = list(_db_ideas.find(filter_q))
+    # Sort server-side so the compound indexes return ideas already ordered
+    sort_field = "votes" if sort == "votes" else "comments_count"
 
-    # Compute comment counts for all ideas in one pass
-    idea_ids = [i["_id"] for i in ideas]
-    counts = {iid: 0 for iid in idea_ids}
-    if idea_ids:
-        pipeline = [
-            {"$match": {"idea_id": {"$in": [str(iid) for iid in idea_ids]}}},
-            {"$group": {"_id": "$idea_id", "count": {"$sum": 1}}},
-        ]
-        for row in _db_comments.aggregate(pipeline):
-            try:
-                oid = ObjectId(row["_id"])  # convert back to ObjectId to map
-            except Exception:
-                continue
-            counts[oid] = row["count"]
-
-    items = []
-    for i in ideas:
-        s = serialize_id(i)
-        s["comments_count"] = counts.get(i["_id"], 0)
-        items.append(s)
+    # Keyset pagination: resume strictly after the (key, created_at, _id) in the cursor
+    if after:
+        filter_q.update(keyset_filter(sort_field, *decode_cursor(after, sort)))
 
-    # Sort
-    reverse = True
-    if sort == "votes":
-        items.sort(key=lambda x: (x.get("votes", 0), x["created_at"]), reverse=True)
-    else:
-        items.sort(key=lambda x: (x.get("comments_count", 0), x["created_at"]), reverse=True)
-
-    return [IdeaOut(**it) for it in items]
+    cursor = (
+        _db_ideas_out.find(filter_q, _IDEA_FIELDS)
+        .sort([(sort_field, DESCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)])
+        .limit(limit)
+    )
+    items = await cursor.to_list(length=None)
+    # A full page may have more after it; hand the client a token for the next one
+    headers = {"X-Next-Cursor": encode_cursor(sort, items[-1])} if len(items) == limit else {}
+    # Serialize the validated page to JSON bytes in pydantic-core directly,
+    # without rebuilding a dict per item first
+    return _IDEA_LIST_ADAPTER.dump_json(_IDEA_LIST_ADAPTER.validate_python(items)), headers
+
+
+@app.get("/ideas", response_model=None, responses={200: {"model": List[IdeaOut]}})
+async def list_ideas(
+    range: Literal["all", "month", "week"] = "all",
+    sort: Literal["votes", "comments"] = "votes",
+    limit: int = Query(default=50, ge=1, le=100),
+    after: Optional[str] = None,
+    if_none_match: Optional[str] = Header(default=None),
+):
+    # Bursts of identical list requests share one DB read for a couple of seconds
+    etag, body, headers = await ideas_cache.get_or_fetch(
+        (range, sort, limit, after), lambda: _fetch_ideas_page(range, sort, limit, after)
+    )
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, **headers})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, **headers})
 
 
 @app.post("/ideas/{idea_id}/upvote", response_model=IdeaOut)
-def upvote_idea(idea_id: str):
-    res = _db_ideas.find_one_and_update(
-        {"_id": PyObjectId.validate(idea_id)},
-        {"$inc": {"votes": 1}, "$set": {"updated_at": datetime.utcnow()}},
+async def upvote_idea(idea_id: str):
+    oid = parse_object_id(idea_id)
+    res = await _db_ideas_out.find_one_and_update(
+        {"_id": oid},
+        {"$inc": {"votes": 1}, "$set": {"updated_at": _utcnow()}},
+        projection=_IDEA_FIELDS,
         return_document=True,
     )
     if not res:
         raise HTTPException(status_code=404, detail="Idea not found")
-    # comment count
-    count = _db_comments.count_documents({"idea_id": idea_id})
-    s = serialize_id(res)
-    s["comments_count"] = count
-    return IdeaOut(**s)
+    ideas_cache.invalidate()
+    return IdeaOut(**res)
 
 
-@app.get("/ideas/{idea_id}/comments", response_model=List[CommentOut])
-def list_comments(idea_id: str):
-    docs = list(_db_comments.find({"idea_id": idea_id}).sort("created_at", DESCENDING))
-    return [CommentOut(**serialize_id(d)) for d in docs]
+@app.get("/ideas/{idea_id}/comments", response_model=None, responses={200: {"model": List[CommentOut]}})
+async def list_comments(idea_id: str, limit: int = Query(default=50, ge=1, le=100), after: Optional[str] = None):
+    oid = parse_object_id(idea_id)
+    # Until migrate() has converted legacy hex-string idea_ids, match both forms
+    filter_q = {"idea_id": oid if _migration_done() else {"$in": [oid, str(oid)]}}
+    if after:
+        filter_q["_id"] = {"$lt": parse_object_id(after, "Invalid cursor")}
+    # _id is generated at insert time, so it orders comments newest-first like created_at
+    docs = await _db_comments_out.find(filter_q, _COMMENT_FIELDS).sort("_id", DESCENDING).limit(limit).to_list(length=None)
+    # Same protocol as /ideas: a full page carries the cursor for the next one
+    headers = {"X-Next-Cursor": docs[-1]["id"]} if len(docs) == limit else {}
+    body = _COMMENT_LIST_ADAPTER.dump_json(_COMMENT_LIST_ADAPTER.validate_python(docs))
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.post("/ideas/{idea_id}/comments", response_model=CommentOut)
-def add_comment(idea_id: str, payload: CommentCreate):
-    # ensure idea exists
-    idea = _db_ideas.find_one({"_id": PyObjectId.validate(idea_id)})
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    now = datetime.utcnow()
+async def add_comment(idea_id: str, payload: CommentCreate):
+    oid = parse_object_id(idea_id)
+    # An $inc on an idea the backfill has not reached would create a partial
+    # comments_count, so comments wait until the migration is done
+    await _wait_for_migration()
+    now = _utcnow()
     doc = {
-        "idea_id": idea_id,
+        "_id": ObjectId(),
+        "idea_id": oid,
         "author": (payload.author.strip() if payload.author else None),
         "content": payload.content.strip(),
         "created_at": now,
         "updated_at": now,
     }
-    result = _db_comments.insert_one(doc)
-    saved = _db_comments.find_one({"_id": result.inserted_id})
-    return CommentOut(**serialize_id(saved))
+    # Insert first so an interrupted request can never leave comments_count
+    # ahead of the comments that exist; bumping the counter then doubles as
+    # the existence check, saving a find_one round trip
+    await _db_comments.insert_one(doc)
+    bumped = await _db_ideas.update_one({"_id": oid}, {"$inc": {"comments_count": 1}})
+    if not bumped.matched_count:
+        await _db_comments.delete_one({"_id": doc["_id"]})
+        raise HTTPException(status_code=404, detail="Idea not found")
+    ideas_cache.invalidate()
+    return CommentOut(**as_api_document(doc))
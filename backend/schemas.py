@@ -7,6 +7,7 @@ class Idea(BaseModel):
     title: str = Field(min_length=1, max_length=200)
     description: Optional[str] = Field(default=None, max_length=2000)
     votes: int = 0
+    comments_count: int = 0
     created_at: datetime
     updated_at: datetime
 
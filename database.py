@@ -5,7 +5,6 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
@@ -15,15 +14,16 @@ from pydantic import BaseModel
 # Load environment variables from .env file
 load_dotenv()
 
-_client = None
 db = None
 
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
-    db = _client[database_name]
+    # Reuse the single client/pool owned by backend/database.py. Motor wraps a
+    # synchronous pymongo Database, so these helpers stay blocking calls.
+    from backend.database import db as _async_db
+    db = _async_db.delegate
 
 # Helper functions for common database operations
 def create_document(collection_name: str, data: Union[BaseModel, dict]):
@@ -37,8 +37,9 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     else:
         data_dict = data.copy()
 
-    data_dict['created_at'] = datetime.now(timezone.utc)
-    data_dict['updated_at'] = datetime.now(timezone.utc)
+    now = datetime.now(timezone.utc)
+    data_dict['created_at'] = now
+    data_dict['updated_at'] = now
 
     result = db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
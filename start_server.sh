@@ -13,7 +13,7 @@ fi
 
 mkdir -p logs
 echo "Installing dependencies..."
-pip install -r requirements.txt
+pip install -r backend/requirements.txt
 echo "Starting FastAPI server..."
-nohup uvicorn main:app --host 0.0.0.0 --port 8000 --reload > logs/server.log 2>&1 
+nohup uvicorn backend.main:app --host 0.0.0.0 --port 8000 --reload > logs/server.log 2>&1 
 echo "Server started in background"
@@ -0,0 +1,87 @@
+import asyncio
+
+from backend.cache import ResponseCache, _etag, etag_matches
+
+
+def test_etag_matches():
+    etag = _etag(b"[]")
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches(f"W/{etag}", etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    # The quotes are part of the tag
+    assert not etag_matches(etag.strip('"'), etag)
+
+
+def test_hit_reuses_entry():
+    async def run():
+        cache = ResponseCache()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return b"body", {"X-Next-Cursor": "c"}
+
+        first = await cache.get_or_fetch("k", fetch)
+        second = await cache.get_or_fetch("k", fetch)
+        return first, second, calls
+
+    first, second, calls = asyncio.run(run())
+    assert first == second == (_etag(b"body"), b"body", {"X-Next-Cursor": "c"})
+    assert len(calls) == 1
+
+
+def test_concurrent_misses_share_one_fetch():
+    async def run():
+        cache = ResponseCache()
+        calls = []
+        release = asyncio.Event()
+
+        async def fetch():
+            calls.append(1)
+            await release.wait()
+            return b"body", {}
+
+        tasks = [asyncio.ensure_future(cache.get_or_fetch("k", fetch)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+        return results, calls, cache._locks
+
+    results, calls, locks = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(r == results[0] for r in results)
+    assert locks == {}
+
+
+def test_invalidate_during_fetch_skips_store():
+    async def run():
+        cache = ResponseCache()
+        bodies = iter([b"stale", b"fresh"])
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_fetch():
+            started.set()
+            await release.wait()
+            return next(bodies), {}
+
+        async def fetch():
+            return next(bodies), {}
+
+        pending = asyncio.ensure_future(cache.get_or_fetch("k", slow_fetch))
+        await started.wait()
+        cache.invalidate()
+        release.set()
+        in_flight = await pending
+        after = await cache.get_or_fetch("k", fetch)
+        return in_flight, after
+
+    in_flight, after = asyncio.run(run())
+    # The request that was already waiting still gets its result...
+    assert in_flight[1] == b"stale"
+    # ...but it is not cached, so the next read fetches again
+    assert after[1] == b"fresh"
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from bson import ObjectId, decode, encode
+
+from backend.database import API_CODEC_OPTIONS, ApiDocument, as_api_document
+
+
+def test_decode_shapes_ids():
+    oid, idea_oid = ObjectId(), ObjectId()
+    doc = decode(encode({"_id": oid, "idea_id": idea_oid, "content": "hi"}), codec_options=API_CODEC_OPTIONS)
+    assert isinstance(doc, ApiDocument)
+    assert doc == {"id": str(oid), "idea_id": str(idea_oid), "content": "hi"}
+    assert "_id" not in doc
+
+
+def test_as_api_document_matches_a_read():
+    oid = ObjectId()
+    now = datetime(2026, 1, 2, 3, 4, 5, 678901)
+    doc = {"_id": oid, "title": "t", "description": None, "votes": 0, "created_at": now, "updated_at": now}
+    out = as_api_document(doc)
+    assert out == {
+        "id": str(oid),
+        "title": "t",
+        "description": None,
+        "votes": 0,
+        # BSON datetimes keep milliseconds only, exactly as the server stores them
+        "created_at": datetime(2026, 1, 2, 3, 4, 5, 678000),
+        "updated_at": datetime(2026, 1, 2, 3, 4, 5, 678000),
+    }
+    # The written document itself is left alone
+    assert doc["_id"] is oid and doc["created_at"] is now
+
+
+def test_nested_documents_are_shaped_too():
+    oid = ObjectId()
+    out = as_api_document({"_id": ObjectId(), "ref": {"_id": oid}})
+    assert out["ref"] == {"id": str(oid)}
@@ -0,0 +1,40 @@
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from backend.main import PyObjectId, parse_object_id
+
+HEX = "0123456789abcdefABCDEF01"
+
+
+def test_validate_hex():
+    assert PyObjectId.validate(HEX) == ObjectId(HEX)
+
+
+def test_validate_passes_object_ids_through():
+    oid = ObjectId()
+    assert PyObjectId.validate(oid) is oid
+
+
+@pytest.mark.parametrize("value", [HEX + "\n", " " + HEX, HEX[:-1], HEX + "0", "z" * 24, "", b"a" * 12, 12, None])
+def test_validate_rejects(value):
+    with pytest.raises(ValueError):
+        PyObjectId.validate(value)
+
+
+def test_parse_object_id():
+    assert parse_object_id(HEX) == ObjectId(HEX)
+
+
+def test_parse_object_id_400():
+    with pytest.raises(HTTPException) as exc:
+        parse_object_id("nope")
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "Invalid idea id"
+
+
+def test_parse_object_id_custom_detail():
+    with pytest.raises(HTTPException) as exc:
+        parse_object_id(HEX + "\n", "Invalid cursor")
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "Invalid cursor"
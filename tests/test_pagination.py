@@ -0,0 +1,82 @@
+import base64
+from datetime import datetime
+
+import pytest
+from bson import ObjectId, encode
+from fastapi import HTTPException
+
+from backend.main import decode_cursor, encode_cursor, keyset_filter
+
+
+def _token(**fields):
+    return base64.urlsafe_b64encode(encode(fields)).decode()
+
+
+def _assert_invalid(token, sort="votes"):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(token, sort)
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "Invalid cursor"
+
+
+def test_cursor_round_trip():
+    oid = ObjectId()
+    created = datetime(2026, 1, 2, 3, 4, 5, 678000)
+    doc = {"id": str(oid), "votes": 3, "comments_count": 7, "created_at": created}
+    assert decode_cursor(encode_cursor("votes", doc), "votes") == (3, created, oid)
+    assert decode_cursor(encode_cursor("comments", doc), "comments") == (7, created, oid)
+
+
+def test_cursor_round_trip_missing_key():
+    oid = ObjectId()
+    created = datetime(2026, 1, 2)
+    doc = {"id": str(oid), "votes": 0, "created_at": created}
+    assert decode_cursor(encode_cursor("comments", doc), "comments") == (None, created, oid)
+
+
+def test_cursor_wrong_sort():
+    doc = {"id": str(ObjectId()), "votes": 1, "comments_count": 1, "created_at": datetime(2026, 1, 1)}
+    _assert_invalid(encode_cursor("votes", doc), "comments")
+
+
+@pytest.mark.parametrize("token", ["", "garbage", "!!!!", base64.urlsafe_b64encode(b"not bson").decode()])
+def test_cursor_garbage(token):
+    _assert_invalid(token)
+
+
+def test_cursor_missing_fields():
+    _assert_invalid(_token(s="votes", k=1, t=datetime(2026, 1, 1)))
+
+
+@pytest.mark.parametrize("key", [{"$ne": 0}, {"$where": "sleep(1000)"}, "1", 1.5, True, [1]])
+def test_cursor_rejects_non_int_key(key):
+    _assert_invalid(_token(s="votes", k=key, t=datetime(2026, 1, 1), i=ObjectId()))
+
+
+def test_cursor_rejects_bad_types():
+    _assert_invalid(_token(s="votes", k=1, t="2026-01-01", i=ObjectId()))
+    _assert_invalid(_token(s="votes", k=1, t=datetime(2026, 1, 1), i=str(ObjectId())))
+
+
+def test_keyset_filter_numeric_key():
+    oid, created = ObjectId(), datetime(2026, 1, 1)
+    assert keyset_filter("votes", 5, created, oid) == {
+        "$or": [
+            {"votes": {"$lt": 5}},
+            # Rows without the field sort last and still follow a numeric key
+            {"votes": None},
+            {"votes": 5, "created_at": {"$lt": created}},
+            {"votes": 5, "created_at": created, "_id": {"$lt": oid}},
+        ]
+    }
+
+
+def test_keyset_filter_null_key():
+    oid, created = ObjectId(), datetime(2026, 1, 1)
+    # Nothing sorts below null, so only other null rows can follow
+    assert keyset_filter("comments_count", None, created, oid) == {
+        "$or": [
+            {"comments_count": None, "created_at": {"$lt": created}},
+            {"comments_count": None, "created_at": created, "_id": {"$lt": oid}},
+        ]
+    }